@@ -1,3 +1,5 @@
+from django.db import IntegrityError, transaction
+
 from .. import models
 from ..webhooks import registry
 
@@ -7,6 +9,10 @@ def add_event(stripe_id, kind, livemode, message, api_version="",
     """
     Adds and processes an event from a received webhook
 
+    The event is inserted inside a savepoint and the unique constraint on
+    `stripe_id` is relied upon to reject duplicate deliveries, rather than
+    checking for an existing record first.
+
     Args:
         stripe_id: the stripe id of the event
         kind: the label of the event
@@ -15,6 +21,10 @@ def add_event(stripe_id, kind, livemode, message, api_version="",
         api_version: the version of the Stripe API used
         request_id: the id of the request that initiated the webhook
         pending_webhooks: the number of pending webhooks
+
+    Returns:
+        the new event, or None if an event with the same stripe_id
+        already exists
     """
     stripe_account_id = message.get("account")
     if stripe_account_id:
@@ -23,20 +33,27 @@ def add_event(stripe_id, kind, livemode, message, api_version="",
         )
     else:
         stripe_account = None
-    event = models.Event.objects.create(
-        stripe_account=stripe_account,
-        stripe_id=stripe_id,
-        kind=kind,
-        livemode=livemode,
-        webhook_message=message,
-        api_version=api_version,
-        request=request_id,
-        pending_webhooks=pending_webhooks
-    )
+    try:
+        with transaction.atomic():
+            event = models.Event.objects.create(
+                stripe_account=stripe_account,
+                stripe_id=stripe_id,
+                kind=kind,
+                livemode=livemode,
+                webhook_message=message,
+                api_version=api_version,
+                request=request_id,
+                pending_webhooks=pending_webhooks
+            )
+    except IntegrityError:
+        if not dupe_event_exists(stripe_id):
+            raise
+        return None
     WebhookClass = registry.get(kind)
     if WebhookClass is not None:
         webhook = WebhookClass(event)
         webhook.process()
+    return event
 
 
 def dupe_event_exists(stripe_id):
@@ -6,6 +6,7 @@ from unittest import skipIf
 
 import django
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError
 from django.test import TestCase
 from django.utils import timezone
 
@@ -669,6 +670,18 @@ class EventsTests(TestCase):
         self.assertEquals(event.kind, "account.updated")
         self.assertTrue(ProcessMock.called)
 
+    @patch("pinax.stripe.webhooks.AccountUpdatedWebhook.process")
+    def test_add_event_duplicate(self, ProcessMock):
+        Event.objects.create(stripe_id="evt_004", kind="account.updated", livemode=True, webhook_message={})
+        event = events.add_event(stripe_id="evt_004", kind="account.updated", livemode=True, message={})
+        self.assertIsNone(event)
+        self.assertEquals(Event.objects.filter(stripe_id="evt_004").count(), 1)
+        self.assertFalse(ProcessMock.called)
+
+    def test_add_event_integrity_error_not_duplicate(self):
+        with self.assertRaises(IntegrityError):
+            events.add_event(stripe_id="evt_005", kind="account.updated", livemode=None, message={})
+
     def test_add_event_new_webhook_kind(self):
         events.add_event(stripe_id="evt_002", kind="patrick.got.coffee", livemode=True, message={})
         event = Event.objects.get(stripe_id="evt_002")
@@ -3,12 +3,11 @@ import json
 
 from django.contrib.auth import get_user_model
 from django.dispatch import Signal
-from django.test import TestCase
-from django.test.client import Client
+from django.test import SimpleTestCase, TestCase
 
 import six
 import stripe
-from mock import patch
+from mock import Mock, patch
 
 from . import (
     PLAN_CREATED_TEST_DATA,
@@ -34,7 +33,8 @@ from ..webhooks import (
     CustomerSubscriptionCreatedWebhook,
     CustomerUpdatedWebhook,
     InvoiceCreatedWebhook,
-    registry
+    registry,
+    stripe_object_to_dict
 )
 
 try:
@@ -52,6 +52,28 @@ class WebhookRegistryTest(TestCase):
     def test_get_signal_keyerror(self):
         self.assertIsNone(registry.get_signal("not a webhook"))
 
+    def test_get(self):
+        self.assertIs(registry.get("account.updated"), AccountUpdatedWebhook)
+        self.assertIsNone(registry.get("not a webhook"))
+
+    def test_getitem(self):
+        entry = registry["account.updated"]
+        self.assertIs(entry["webhook"], AccountUpdatedWebhook)
+        self.assertIs(entry["signal"], registry.get_signal("account.updated"))
+
+
+class StripeObjectToDictTest(SimpleTestCase):
+
+    def test_nested_objects_are_plain(self):
+        obj = stripe.StripeObject.construct_from({
+            "id": "evt_XXX",
+            "data": {"object": {"id": "tr_XXX", "items": [{"amount": 455}]}}
+        }, "sk_test_XXX")
+        result = stripe_object_to_dict(obj.to_dict())
+        self.assertIs(type(result["data"]), dict)
+        self.assertIs(type(result["data"]["object"]["items"][0]), dict)
+        self.assertEqual(result["data"]["object"]["items"][0]["amount"], 455)
+
 
 class WebhookTests(TestCase):
 
@@ -104,57 +126,103 @@ class WebhookTests(TestCase):
         "type": "transfer.created"
     }
 
+    @classmethod
+    def setUpTestData(cls):
+        cls.webhook_url = reverse("pinax_stripe_webhook")
+        cls.event_body = six.u(json.dumps(cls.event_data))
+        cls.connect_event_data = dict(cls.event_data, account="acc_XXX")
+        cls.connect_event_body = six.u(json.dumps(cls.connect_event_data))
+
     @patch("stripe.Event.retrieve")
     @patch("stripe.Transfer.retrieve")
     def test_webhook_with_transfer_event(self, TransferMock, StripeEventMock):
         StripeEventMock.return_value.to_dict.return_value = self.event_data
         TransferMock.return_value = self.event_data["data"]["object"]
-        msg = json.dumps(self.event_data)
-        resp = Client().post(
-            reverse("pinax_stripe_webhook"),
-            six.u(msg),
+        resp = self.client.post(
+            self.webhook_url,
+            self.event_body,
             content_type="application/json"
         )
         self.assertEquals(resp.status_code, 200)
         self.assertTrue(Event.objects.filter(kind="transfer.created").exists())
 
+    @patch("stripe.Event.retrieve")
+    def test_validate_with_nested_stripe_objects(self, StripeEventMock):
+        StripeEventMock.return_value = stripe.StripeObject.construct_from(self.event_data, "sk_test_XXX")
+        event = Event(
+            stripe_id=self.event_data["id"],
+            kind="transfer.created",
+            livemode=True,
+            webhook_message=json.loads(self.event_body)
+        )
+        registry.get(event.kind)(event).validate()
+        self.assertTrue(event.valid)
+        self.assertIs(type(event.validated_message["data"]["object"]), dict)
+
+    @patch("pinax.stripe.views.orjson")
     @patch("stripe.Event.retrieve")
     @patch("stripe.Transfer.retrieve")
-    def test_webhook_associated_with_stripe_account(self, TransferMock, StripeEventMock):
-        connect_event_data = self.event_data.copy()
-        account = Account.objects.create(stripe_id="acc_XXX")
-        connect_event_data["account"] = account.stripe_id
-        StripeEventMock.return_value.to_dict.return_value = connect_event_data
-        TransferMock.return_value = connect_event_data["data"]["object"]
-        msg = json.dumps(connect_event_data)
-        resp = Client().post(
-            reverse("pinax_stripe_webhook"),
-            six.u(msg),
+    def test_webhook_with_transfer_event_decoded_by_orjson(self, TransferMock, StripeEventMock, OrjsonMock):
+        OrjsonMock.loads.side_effect = lambda body: json.loads(body.decode("utf-8"))
+        StripeEventMock.return_value.to_dict.return_value = self.event_data
+        TransferMock.return_value = self.event_data["data"]["object"]
+        resp = self.client.post(
+            self.webhook_url,
+            self.event_body,
+            content_type="application/json"
+        )
+        self.assertEquals(resp.status_code, 200)
+        OrjsonMock.loads.assert_called_once_with(self.event_body.encode("utf-8"))
+        self.assertTrue(Event.objects.filter(kind="transfer.created").exists())
+
+    @patch("pinax.stripe.views.orjson", None)
+    @patch("stripe.Event.retrieve")
+    @patch("stripe.Transfer.retrieve")
+    def test_webhook_with_transfer_event_without_orjson(self, TransferMock, StripeEventMock):
+        StripeEventMock.return_value.to_dict.return_value = self.event_data
+        TransferMock.return_value = self.event_data["data"]["object"]
+        resp = self.client.post(
+            self.webhook_url,
+            self.event_body,
             content_type="application/json"
         )
         self.assertEquals(resp.status_code, 200)
         self.assertTrue(Event.objects.filter(kind="transfer.created").exists())
-        self.assertEqual(
-            Event.objects.filter(kind="transfer.created").first().stripe_account,
-            account
+
+    @patch("stripe.Event.retrieve")
+    @patch("stripe.Transfer.retrieve")
+    def test_webhook_associated_with_stripe_account(self, TransferMock, StripeEventMock):
+        account = Account.objects.create(stripe_id=self.connect_event_data["account"])
+        StripeEventMock.return_value.to_dict.return_value = self.connect_event_data
+        TransferMock.return_value = self.connect_event_data["data"]["object"]
+        resp = self.client.post(
+            self.webhook_url,
+            self.connect_event_body,
+            content_type="application/json"
         )
+        self.assertEquals(resp.status_code, 200)
+        event = Event.objects.filter(kind="transfer.created").first()
+        self.assertIsNotNone(event)
+        self.assertEqual(event.stripe_account, account)
         self.assertEquals(TransferMock.call_args_list, [
             [("ach_XXXXXXXXXXXX",), {"stripe_account": "acc_XXX"}],
         ])
 
     def test_webhook_duplicate_event(self):
-        data = {"id": 123}
-        Event.objects.create(stripe_id=123, livemode=True)
+        data = {"id": 123, "type": "transfer.created", "livemode": True, "api_version": ""}
+        existing = Event.objects.create(stripe_id=123, livemode=True)
         msg = json.dumps(data)
-        resp = Client().post(
-            reverse("pinax_stripe_webhook"),
+        resp = self.client.post(
+            self.webhook_url,
             six.u(msg),
             content_type="application/json"
         )
         self.assertEquals(resp.status_code, 200)
         dupe_event_exception = EventProcessingException.objects.get()
         self.assertEqual(dupe_event_exception.message, "Duplicate event record")
-        self.assertEqual(str(dupe_event_exception.data), '{"id": 123}')
+        self.assertEqual(str(dupe_event_exception.data), msg)
+        self.assertEqual(dupe_event_exception.event, existing)
+        self.assertEqual(Event.objects.count(), 1)
 
     def test_webhook_event_mismatch(self):
         event = Event(kind="account.updated")
@@ -169,6 +237,11 @@ class WebhookTests(TestCase):
         WH(event).send_signal()
         self.assertTrue(SignalSendMock.called)
 
+    def test_send_signal_no_listeners(self):
+        event = Event(kind="account.application.deauthorized")
+        WH = registry.get("account.application.deauthorized")
+        self.assertEqual(WH(event).send_signal(), [])
+
     def test_send_signal_not_sent(self):
         event = Event(kind="account.application.deauthorized")
         WH = registry.get("account.application.deauthorized")
@@ -215,7 +288,7 @@ class ChargeWebhookTest(TestCase):
     @patch("stripe.Charge.retrieve")
     @patch("pinax.stripe.actions.charges.sync_charge_from_stripe_data")
     def test_process_webhook(self, SyncMock, RetrieveMock):
-        event = Event.objects.create(kind=ChargeCapturedWebhook.name, webhook_message={}, valid=True, processed=False)
+        event = Event(kind=ChargeCapturedWebhook.name, webhook_message={}, valid=True, processed=False)
         event.validated_message = dict(data=dict(object=dict(id=1)))
         ChargeCapturedWebhook(event).process_webhook()
         self.assertTrue(SyncMock.called)
@@ -255,13 +328,13 @@ class CustomerUpdatedWebhookTest(TestCase):
 
     @patch("pinax.stripe.actions.customers.sync_customer")
     def test_process_webhook_without_customer(self, SyncMock):
-        event = Event.objects.create(kind=CustomerUpdatedWebhook.name, webhook_message={}, valid=True, processed=False)
+        event = Event(kind=CustomerUpdatedWebhook.name, webhook_message={}, valid=True, processed=False)
         CustomerUpdatedWebhook(event).process_webhook()
         self.assertEquals(SyncMock.call_count, 0)
 
     @patch("pinax.stripe.actions.customers.sync_customer")
     def test_process_webhook_without_customer_with_data(self, SyncMock):
-        event = Event.objects.create(kind=CustomerUpdatedWebhook.name, webhook_message={}, valid=True, processed=False)
+        event = Event(kind=CustomerUpdatedWebhook.name, webhook_message={}, valid=True, processed=False)
         obj = object()
         event.validated_message = dict(data=dict(object=obj))
         CustomerUpdatedWebhook(event).process_webhook()
@@ -283,7 +356,7 @@ class CustomerSourceCreatedWebhookTest(TestCase):
 
     @patch("pinax.stripe.actions.sources.sync_payment_source_from_stripe_data")
     def test_process_webhook(self, SyncMock):
-        event = Event.objects.create(kind=CustomerSourceCreatedWebhook.name, webhook_message={}, valid=True, processed=False)
+        event = Event(kind=CustomerSourceCreatedWebhook.name, webhook_message={}, valid=True, processed=False)
         event.validated_message = dict(data=dict(object=dict()))
         CustomerSourceCreatedWebhook(event).process_webhook()
         self.assertTrue(SyncMock.called)
@@ -293,7 +366,7 @@ class CustomerSourceDeletedWebhookTest(TestCase):
 
     @patch("pinax.stripe.actions.sources.delete_card_object")
     def test_process_webhook(self, SyncMock):
-        event = Event.objects.create(kind=CustomerSourceDeletedWebhook.name, webhook_message={}, valid=True, processed=False)
+        event = Event(kind=CustomerSourceDeletedWebhook.name, webhook_message={}, valid=True, processed=False)
         event.validated_message = dict(data=dict(object=dict(id=1)))
         CustomerSourceDeletedWebhook(event).process_webhook()
         self.assertTrue(SyncMock.called)
@@ -348,7 +421,7 @@ class CustomerSubscriptionCreatedWebhookTest(TestCase):
     @patch("pinax.stripe.actions.subscriptions.sync_subscription_from_stripe_data")
     @patch("pinax.stripe.actions.customers.sync_customer")
     def test_process_webhook(self, SyncMock, SubSyncMock):
-        event = Event.objects.create(
+        event = Event(
             kind=CustomerSubscriptionCreatedWebhook.name,
             customer=Customer.objects.create(),
             validated_message={"data": {"object": {}}},
@@ -361,7 +434,7 @@ class CustomerSubscriptionCreatedWebhookTest(TestCase):
     @patch("pinax.stripe.actions.subscriptions.sync_subscription_from_stripe_data")
     @patch("pinax.stripe.actions.customers.sync_customer")
     def test_process_webhook_no_customer(self, SyncMock, SubSyncMock):
-        event = Event.objects.create(
+        event = Event(
             kind=CustomerSubscriptionCreatedWebhook.name,
             validated_message={"data": {"object": {}}},
             valid=True,
@@ -375,7 +448,7 @@ class InvoiceCreatedWebhookTest(TestCase):
 
     @patch("pinax.stripe.actions.invoices.sync_invoice_from_stripe_data")
     def test_process_webhook(self, SyncMock):
-        event = Event.objects.create(kind=InvoiceCreatedWebhook.name, webhook_message={}, valid=True, processed=False)
+        event = Event(kind=InvoiceCreatedWebhook.name, webhook_message={}, valid=True, processed=False)
         event.validated_message = dict(data=dict(object=dict(id=1)))
         InvoiceCreatedWebhook(event).process_webhook()
         self.assertTrue(SyncMock.called)
@@ -383,11 +456,18 @@ class InvoiceCreatedWebhookTest(TestCase):
 
 class TestTransferWebhooks(TestCase):
 
+    @classmethod
+    def setUpClass(cls):
+        super(TestTransferWebhooks, cls).setUpClass()
+        cls.created_ev = Mock()
+        cls.created_ev.to_dict.return_value = TRANSFER_CREATED_TEST_DATA
+        cls.pending_ev = Mock()
+        cls.pending_ev.to_dict.return_value = TRANSFER_PENDING_TEST_DATA
+
     @patch("stripe.Event.retrieve")
     @patch("stripe.Transfer.retrieve")
     def test_transfer_created(self, TransferMock, EventMock):
-        ev = EventMock()
-        ev.to_dict.return_value = TRANSFER_CREATED_TEST_DATA
+        EventMock.return_value = self.created_ev
         TransferMock.return_value = TRANSFER_CREATED_TEST_DATA["data"]["object"]
         event = Event.objects.create(
             stripe_id=TRANSFER_CREATED_TEST_DATA["id"],
@@ -405,8 +485,7 @@ class TestTransferWebhooks(TestCase):
     @patch("stripe.Event.retrieve")
     @patch("stripe.Transfer.retrieve")
     def test_transfer_pending_create(self, TransferMock, EventMock):
-        ev = EventMock()
-        ev.to_dict.return_value = TRANSFER_PENDING_TEST_DATA
+        EventMock.return_value = self.pending_ev
         TransferMock.return_value = TRANSFER_PENDING_TEST_DATA["data"]["object"]
         event = Event.objects.create(
             stripe_id=TRANSFER_PENDING_TEST_DATA["id"],
@@ -424,8 +503,7 @@ class TestTransferWebhooks(TestCase):
     @patch("stripe.Event.retrieve")
     @patch("stripe.Transfer.retrieve")
     def test_transfer_paid_updates_existing_record(self, TransferMock, EventMock):
-        ev = EventMock()
-        ev.to_dict.return_value = TRANSFER_CREATED_TEST_DATA
+        EventMock.return_value = self.created_ev
         TransferMock.return_value = TRANSFER_CREATED_TEST_DATA["data"]["object"]
         event = Event.objects.create(
             stripe_id=TRANSFER_CREATED_TEST_DATA["id"],
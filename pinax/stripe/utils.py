@@ -30,10 +30,13 @@ ZERO_DECIMAL_CURRENCIES = [
 ]
 
 
+ONE_HUNDRED = decimal.Decimal("100")
+
+
 def convert_amount_for_db(amount, currency="usd"):
     if currency is None:  # @@@ not sure if this is right; find out what we should do when API returns null for currency
         currency = "usd"
-    return (amount / decimal.Decimal("100")) if currency.lower() not in ZERO_DECIMAL_CURRENCIES else decimal.Decimal(amount)
+    return (amount / ONE_HUNDRED) if currency.lower() not in ZERO_DECIMAL_CURRENCIES else decimal.Decimal(amount)
 
 
 def convert_amount_for_api(amount, currency="usd"):
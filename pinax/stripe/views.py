@@ -22,6 +22,11 @@ from .forms import PaymentMethodForm, PlanForm
 from .mixins import CustomerMixin, LoginRequiredMixin, PaymentsContextMixin
 from .models import Card, Event, Invoice, Subscription
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 class InvoiceListView(LoginRequiredMixin, CustomerMixin, ListView):
     model = Invoice
@@ -196,17 +201,21 @@ class Webhook(View):
         return super(Webhook, self).dispatch(*args, **kwargs)
 
     def post(self, request, *args, **kwargs):
-        body = smart_str(self.request.body)
-        data = json.loads(body)
-        event = Event.objects.filter(stripe_id=data["id"]).first()
-        if event:
-            exceptions.log_exception(body, "Duplicate event record", event=event)
+        if orjson is not None:
+            data = orjson.loads(self.request.body)
         else:
-            events.add_event(
-                stripe_id=data["id"],
-                kind=data["type"],
-                livemode=data["livemode"],
-                api_version=data["api_version"],
-                message=data
+            data = json.loads(smart_str(self.request.body))
+        event = events.add_event(
+            stripe_id=data["id"],
+            kind=data["type"],
+            livemode=data["livemode"],
+            api_version=data["api_version"],
+            message=data
+        )
+        if event is None:
+            exceptions.log_exception(
+                smart_str(self.request.body),
+                "Duplicate event record",
+                event=Event.objects.filter(stripe_id=data["id"]).first()
             )
         return HttpResponse()
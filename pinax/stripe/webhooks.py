@@ -1,5 +1,3 @@
-import json
-
 from django.dispatch import Signal
 
 import stripe
@@ -25,42 +23,47 @@ class WebhookRegistry(object):
 
     def __init__(self):
         self._registry = {}
+        self._signals = {}
 
     def register(self, webhook):
-        self._registry[webhook.name] = {
-            "webhook": webhook,
-            "signal": Signal(providing_args=["event"])
-        }
+        self._registry[webhook.name] = webhook
+        self._signals[webhook.name] = Signal(providing_args=["event"])
 
     def keys(self):
         return self._registry.keys()
 
     def get(self, name, default=None):
-        try:
-            return self[name]["webhook"]
-        except KeyError:
-            return default
+        return self._registry.get(name, default)
 
     def get_signal(self, name, default=None):
-        try:
-            return self[name]["signal"]
-        except KeyError:
-            return default
+        return self._signals.get(name, default)
 
     def signals(self):
-        return {
-            key: self.get_signal(key)
-            for key in self.keys()
-        }
+        return dict(self._signals)
 
     def __getitem__(self, name):
-        return self._registry[name]
+        return {
+            "webhook": self._registry[name],
+            "signal": self._signals[name]
+        }
 
 
 registry = WebhookRegistry()
 del WebhookRegistry
 
 
+def stripe_object_to_dict(obj):
+    """
+    Recursively convert a StripeObject (and any nested ones) to plain
+    dicts and lists, without a round trip through a JSON string
+    """
+    if isinstance(obj, dict):
+        return {key: stripe_object_to_dict(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [stripe_object_to_dict(value) for value in obj]
+    return obj
+
+
 class Registerable(type):
     def __new__(cls, clsname, bases, attrs):
         newclass = super(Registerable, cls).__new__(cls, clsname, bases, attrs)
@@ -92,13 +95,7 @@ class Webhook(with_metaclass(Registerable, object)):
             self.event.stripe_id,
             stripe_account=getattr(self.stripe_account, "stripe_id", None)
         )
-        self.event.validated_message = json.loads(
-            json.dumps(
-                evt.to_dict(),
-                sort_keys=True,
-                cls=stripe.StripeObjectEncoder
-            )
-        )
+        self.event.validated_message = stripe_object_to_dict(evt.to_dict())
         self.event.valid = self.event.webhook_message["data"] == self.event.validated_message["data"]
 
     def send_signal(self):
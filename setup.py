@@ -96,6 +96,7 @@ setup(
     ],
     extras_require={
         "pytest": ["pytest", "pytest-django"] + tests_require,
+        "orjson": ["orjson; python_version >= '3.6'"],
     },
     test_suite="runtests.runtests",
     tests_require=tests_require,